@@ -1,6 +1,8 @@
 import math
+from functools import lru_cache
 from typing import Optional, List, Dict
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 
@@ -14,8 +16,13 @@ def parse_time_to_min(time_str: str) -> Optional[float]:
     """
     if not time_str:
         return None
+    return _parse_time_cached(time_str.strip())
+
+
+@lru_cache(maxsize=512)
+def _parse_time_cached(time_str: str) -> Optional[float]:
     try:
-        parts = [int(p) for p in time_str.strip().split(":")]
+        parts = [int(p) for p in time_str.split(":")]
         if len(parts) == 2:
             m, s = parts
             h = 0
@@ -28,16 +35,29 @@ def parse_time_to_min(time_str: str) -> Optional[float]:
         return None
 
 
+@lru_cache(maxsize=1024)
 def format_min_to_hms(minutes: float) -> str:
-    total_seconds = int(round(minutes * 60))
-    h = total_seconds // 3600
-    m = (total_seconds % 3600) // 60
-    s = total_seconds % 60
+    # A NaN/inf prediction should look invalid, not clamp to 0:00
+    if not math.isfinite(minutes):
+        return "n/a"
+    seconds = minutes * 60
+    total_seconds = int(seconds + 0.5) if seconds > 0 else 0
+    h, rem = divmod(total_seconds, 3600)
+    m, s = divmod(rem, 60)
     if h > 0:
         return f"{h:d}:{m:02d}:{s:02d}"
     return f"{m:d}:{s:02d}"
 
 
+def round_each(values, ndigits: int) -> List[float]:
+    """
+    Round every value with Python round(). Series.round / np.round scale
+    by 10**ndigits first and round half to even, which moves x.x5 values
+    by 0.1.
+    """
+    return [round(float(v), ndigits) for v in values]
+
+
 def speed_from_time(distance_km: float, time_min: float) -> float:
     """km/h given km and minutes."""
     return distance_km / (time_min / 60.0)
@@ -48,6 +68,7 @@ def pace_from_speed(speed_kmh: float) -> float:
     return 60.0 / speed_kmh
 
 
+@lru_cache(maxsize=1024)
 def format_pace(pace_min_per_km: float) -> str:
     m = int(pace_min_per_km)
     s = int(round((pace_min_per_km - m) * 60))
@@ -57,8 +78,26 @@ def format_pace(pace_min_per_km: float) -> str:
     return f"{m:d}:{s:02d} /km"
 
 
+def format_pace_series(pace_min_per_km: pd.Series) -> pd.Series:
+    """Vectorized format_pace: 'm:ss /km' for every value in the Series."""
+    pace = pace_min_per_km.to_numpy(dtype=float)
+    m = np.floor(pace).astype(int)
+    s = np.rint((pace - m) * 60).astype(int)
+    carry = s == 60
+    m = m + carry
+    s = np.where(carry, 0, s)
+    out = np.char.add(m.astype(str), np.where(s < 10, ":0", ":"))
+    out = np.char.add(np.char.add(out, s.astype(str)), " /km")
+    return pd.Series(out.tolist(), index=pace_min_per_km.index)
+
+
 # ---------- Durability & marathon model ----------
 
+# Riegel exponent 1.06 applied to the marathon / 10K distance ratio
+_RIEGEL_10K_TO_MAR = (42.195 / 10.0) ** 1.06
+
+
+@lru_cache(maxsize=256)
 def estimate_df_from_decay_and_volume(
     ten_k_min: Optional[float],
     marathon_min: Optional[float],
@@ -78,9 +117,7 @@ def estimate_df_from_decay_and_volume(
     # 1. Base from 10K→marathon decay, if both are available
     if ten_k_min is not None and marathon_min is not None:
         # Riegel-style prediction of marathon from 10K
-        riegel_exp = 1.06
-        dist_ratio = 42.195 / 10.0
-        predicted_mar_min = ten_k_min * (dist_ratio ** riegel_exp)
+        predicted_mar_min = ten_k_min * _RIEGEL_10K_TO_MAR
 
         decay_ratio = marathon_min / predicted_mar_min  # >1 means slower than Riegel
         # Assume a "typical" good marathoner has decay_ratio ≈ 1.08
@@ -110,6 +147,7 @@ def estimate_df_from_decay_and_volume(
     return df
 
 
+@lru_cache(maxsize=256)
 def marathon_time_from_ats_df(ats_kmh: float, df: float) -> float:
     """
     Marathon prediction in MINUTES from ATS (km/h) and DF.
@@ -119,7 +157,9 @@ def marathon_time_from_ats_df(ats_kmh: float, df: float) -> float:
 
     MPT (min) = (4666 * ATS^-1.33) / DF + 8
     """
-    base = 4666.0 * (ats_kmh ** -1.33)
+    if ats_kmh <= 0 or df <= 0:
+        return float("nan")
+    base = 4666.0 * math.pow(ats_kmh, -1.33)
     return base / df + 8.0
 
 
@@ -168,118 +208,122 @@ PLAN_TEMPLATES: Dict[str, List[Dict]] = {
 }
 
 
-def zone_speed_from_mp(mp_speed: float, zone: str) -> float:
-    """
-    Return target speed in km/h for a given zone,
-    as a percentage of marathon-pace speed.
-    """
-    if zone == "Z1":
-        factor = 0.78   # easy / recovery
-    elif zone == "Z2":
-        factor = 0.88   # steady aerobic
-    elif zone == "Z3":
-        factor = 0.98   # MP / slightly faster
-    elif zone == "Z4":
-        factor = 1.08   # threshold / CV
-    elif zone == "Z5":
-        factor = 1.18   # faster than threshold
-    elif zone == "Z2_Z3":
-        factor = 0.93   # blend of Z2 & Z3
-    elif zone == "Z3_Z4":
-        factor = 1.03   # blend of Z3 & Z4
-    else:
-        factor = 0.88
-    return mp_speed * factor
+# Target speed for each zone as a fraction of marathon-pace speed
+_ZONE_FACTOR: Dict[str, float] = {
+    "Z1": 0.78,     # easy / recovery
+    "Z2": 0.88,     # steady aerobic
+    "Z3": 0.98,     # MP / slightly faster
+    "Z4": 1.08,     # threshold / CV
+    "Z5": 1.18,     # faster than threshold
+    "Z2_Z3": 0.93,  # blend of Z2 & Z3
+    "Z3_Z4": 1.03,  # blend of Z3 & Z4
+}
+_DEFAULT_ZONE_FACTOR = 0.88
 
 
+# Templates as DataFrames, built once at import so reruns only scale them
+_PLAN_DF: Dict[str, pd.DataFrame] = {
+    name: pd.DataFrame(tmpl)
+    .rename(columns={"day": "Day", "name": "Workout", "zone": "Zone"})
+    .assign(factor=lambda t: t["Zone"].map(_ZONE_FACTOR).fillna(_DEFAULT_ZONE_FACTOR))
+    for name, tmpl in PLAN_TEMPLATES.items()
+}
+
+
+@st.cache_data(show_spinner=False)
 def expand_plan(
     plan_name: str,
     weekly_km: float,
     mp_speed: float,
 ) -> pd.DataFrame:
-    rows = []
-    template = PLAN_TEMPLATES[plan_name]
-
-    for block in template:
-        dist_km = weekly_km * block["dist_pct"]
-        # If it's a mixed zone, we still assign one "headline" pace
-        z = block["zone"]
-        spd = zone_speed_from_mp(mp_speed, z)
-        pace = pace_from_speed(spd)
-        rows.append(
-            {
-                "Day": block["day"],
-                "Workout": block["name"],
-                "Zone": z,
-                "Distance_km": round(dist_km, 1),
-                "Target_pace": format_pace(pace),
-                "Target_speed_kmh": round(spd, 2),
-            }
-        )
-    return pd.DataFrame(rows)
-
-
+    base = _PLAN_DF[plan_name]
+    # If it's a mixed zone, we still assign one "headline" pace
+    spd = mp_speed * base["factor"]
+    return pd.DataFrame(
+        {
+            "Day": base["Day"],
+            "Workout": base["Workout"],
+            "Zone": base["Zone"],
+            "Distance_km": round_each(base["dist_pct"] * weekly_km, 1),
+            "Target_speed_kmh": round_each(spd, 2),
+            "_pace_mpk": 60.0 / spd,
+        }
+    )
+
+
+@st.cache_data(show_spinner=False)
 def compute_weekly_ats(df: pd.DataFrame) -> float:
     """Distance-weighted ATS for the generated week."""
-    total_km = df["Distance_km"].sum()
+    dist = df["Distance_km"].to_numpy(dtype=float)
+    pace = df["_pace_mpk"].to_numpy(dtype=float)
+    total_km = float(dist.sum())
     if total_km == 0:
         return 0.0
-    # Use 60 / pace_min_per_km via parsing 'm:ss /km'
-    speeds = []
-    for _, row in df.iterrows():
-        pace_str = row["Target_pace"].split()[0]  # 'm:ss'
-        pace_min = parse_time_to_min(pace_str)
-        if pace_min is None or pace_min <= 0:
-            continue
-        speeds.append(speed_from_time(row["Distance_km"], row["Distance_km"] * pace_min))
-    # If everything went fine, weighted speed is just sum(distance)/sum(time)
-    total_time_h = 0.0
-    for _, row in df.iterrows():
-        pace_str = row["Target_pace"].split()[0]
-        pace_min = parse_time_to_min(pace_str)
-        if pace_min is None or pace_min <= 0:
-            continue
-        time_h = row["Distance_km"] * pace_min / 60.0
-        total_time_h += time_h
+    # Weighted speed is just sum(distance)/sum(time). Paces are unrounded,
+    # so this can differ slightly from ATS recomputed off the m:ss column.
+    total_time_h = float(np.dot(dist, pace)) / 60.0
     if total_time_h == 0:
         return 0.0
-    ats = df["Distance_km"].sum() / total_time_h
-    return ats
+    return total_km / total_time_h
+
+
+def plan_for_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Swap the numeric pace column for a formatted 'm:ss /km' Target_pace."""
+    return df.assign(Target_pace=format_pace_series(df["_pace_mpk"]))[
+        ["Day", "Workout", "Zone", "Distance_km", "Target_pace", "Target_speed_kmh"]
+    ]
 
 
+ZONE_DESCRIPTIONS: Dict[str, str] = {
+    "Z1": "Easy / Recovery",
+    "Z2": "Steady Aerobic",
+    "Z3": "Marathon / Sub-threshold",
+    "Z4": "Threshold / CV",
+    "Z5": "Intervals / Speed",
+}
+
+ZONE_ORDER = ("Z1", "Z2", "Z3", "Z4", "Z5")
+_ZONE_ORDER_ARR = np.array(ZONE_ORDER)
+_ZONE_DESC_ARR = np.array([ZONE_DESCRIPTIONS[z] for z in ZONE_ORDER])
+
+# Share of a workout's km credited to each of Z1..Z5, per template zone.
+# Mixed zones are split evenly between their two parts.
+_ZONE_SHARES: Dict[str, tuple] = {
+    #        Z1   Z2   Z3   Z4   Z5
+    "Z1":    (1.0, 0.0, 0.0, 0.0, 0.0),
+    "Z2":    (0.0, 1.0, 0.0, 0.0, 0.0),
+    "Z3":    (0.0, 0.0, 1.0, 0.0, 0.0),
+    "Z4":    (0.0, 0.0, 0.0, 1.0, 0.0),
+    "Z5":    (0.0, 0.0, 0.0, 0.0, 1.0),
+    "Z2_Z3": (0.0, 0.5, 0.5, 0.0, 0.0),
+    "Z3_Z4": (0.0, 0.0, 0.5, 0.5, 0.0),
+}
+
+
+@st.cache_data(show_spinner=False)
 def summarize_zones(df: pd.DataFrame) -> pd.DataFrame:
-    zone_km = {}
-    for _, row in df.iterrows():
-        z = row["Zone"]
-        km = row["Distance_km"]
-        # Split mixed zones evenly
-        if z in ("Z2_Z3", "Z3_Z4"):
-            parts = z.split("_")
-            for part in parts:
-                zone_km[part] = zone_km.get(part, 0.0) + km * 0.5
-        else:
-            zone_km[z] = zone_km.get(z, 0.0) + km
-
-    rows = []
-    total = sum(zone_km.values())
-    for z in sorted(zone_km.keys()):
-        pct = 100.0 * zone_km[z] / total if total > 0 else 0
-        desc = {
-            "Z1": "Easy / Recovery",
-            "Z2": "Steady Aerobic",
-            "Z3": "Marathon / Sub-threshold",
-            "Z4": "Threshold / CV",
-            "Z5": "Intervals / Speed",
-        }.get(z, "")
-        rows.append(
-            {
-                "Zone": z,
-                "Description": desc,
-                "km": round(zone_km[z], 1),
-                "% of week": round(pct, 1),
-            }
-        )
-    return pd.DataFrame(rows)
+    known = df["Zone"].isin(_ZONE_SHARES).to_numpy()
+    shares = np.array(df["Zone"][known].map(_ZONE_SHARES).tolist()).reshape(-1, len(ZONE_ORDER))
+    zone_km = (df["Distance_km"].to_numpy(dtype=float)[known, None] * shares).sum(axis=0)
+    # A zone is listed if any workout touches it, even with 0 km
+    touched = shares > 0
+    present = touched.any(axis=0)
+    # Sum the total in the order zones first appear in the plan. A different
+    # float summation order can shift the total by an ulp, which is enough to
+    # flip round(pct, 1) on .x5 boundaries.
+    first_seen = pd.unique(np.nonzero(touched)[1])
+    total = sum(zone_km[first_seen].tolist())
+    zone_km = zone_km[present]
+
+    pct = 100.0 * zone_km / total if total > 0 else np.zeros_like(zone_km)
+    return pd.DataFrame(
+        {
+            "Zone": _ZONE_ORDER_ARR[present],
+            "Description": _ZONE_DESC_ARR[present],
+            "km": round_each(zone_km, 1),
+            "% of week": round_each(pct, 1),
+        }
+    )
 
 
 # ---------- Streamlit UI ----------
@@ -359,7 +403,9 @@ st.sidebar.markdown(
 )
 
 predicted_mar_min = marathon_time_from_ats_df(target_ats, df_est)
-predicted_mar_pace = pace_from_speed(42.195 / (predicted_mar_min / 60.0))
+# MP speed and pace straight from the predicted time, each computed once
+mp_speed = 42.195 * 60.0 / predicted_mar_min
+predicted_mar_pace = predicted_mar_min / 42.195
 
 st.subheader("Model Summary")
 
@@ -372,12 +418,11 @@ with col3:
     st.metric("Marathon Prediction", format_min_to_hms(predicted_mar_min))
 
 st.markdown(
-    f"- **Marathon pace (MP)**: `{predicted_mar_pace}`  \n"
+    f"- **Marathon pace (MP)**: `{format_pace(predicted_mar_pace)}`  \n"
     f"- We treat **ATS** as the main engine (~70% of your time), and **DF** as how well your training lets you *keep* that speed (~30%)."
 )
 
-# Compute MP speed and build weekly plan
-mp_speed = 42.195 / (predicted_mar_min / 60.0)
+# Build weekly plan at MP speed
 week_df = expand_plan(plan_name, weekly_km, mp_speed)
 week_ats = compute_weekly_ats(week_df)
 zone_summary = summarize_zones(week_df)
@@ -394,7 +439,7 @@ you can either **raise weekly km** slightly or **bump the ATS slider** and re-ge
 """
 )
 
-st.dataframe(week_df, hide_index=True)
+st.dataframe(plan_for_display(week_df), hide_index=True)
 
 st.subheader("Zone Breakdown (relative to MP)")
 